@@ -30,11 +30,8 @@ __all__ = [
 def get_files(user_id, section="playground", project="default"):
     area = SavedFile(user_id, fix=True, section=section)
     the_directory = directory_for(area, project)
-    files = [
-        os.path.join(the_directory, f)
-        for f in os.listdir(the_directory)
-        if os.path.isfile(os.path.join(the_directory, f))
-    ]
+    with os.scandir(the_directory) as entries:
+        files = [entry.path for entry in entries if entry.is_file()]
     return files
 
 
@@ -156,7 +153,7 @@ except ImportError:
     __path__ = __import__('pkgutil').extend_path(__path__, __name__)
 """
     licensetext = str(info["license"])
-    if re.search(r"MIT License", licensetext):
+    if "MIT License" in licensetext:
         licensetext += (
             "\n\nCopyright (c) "
             + str(datetime.datetime.now().year)
@@ -322,40 +319,19 @@ This directory is used to store templates.
         os.path.join(pkg_path_templates_prefix, "README.md"), templatesreadme
     )
 
-    # Modules
-    for f in folders_and_files.get("modules", []):
-        try:
-            zip_obj.write(f, os.path.join(pkg_path_deep_prefix, os.path.basename(f)))
-        except:
-            log("Unable to add file " + repr(f))
-    # Templates
-    for f in folders_and_files.get("templates", []):
-        try:
-            zip_obj.write(
-                f, os.path.join(pkg_path_templates_prefix, os.path.basename(f))
-            )
-        except:
-            log("Unable to add file " + repr(f))
-    # sources
-    for f in folders_and_files.get("sources", []):
-        try:
-            zip_obj.write(f, os.path.join(pkg_path_sources_prefix, os.path.basename(f)))
-        except:
-            log("Unable to add file " + repr(f))
-    # static
-    for f in folders_and_files.get("static", []):
-        try:
-            zip_obj.write(f, os.path.join(pkg_path_static_prefix, os.path.basename(f)))
-        except:
-            log("Unable to add file " + repr(f))
-    # questions
-    for f in folders_and_files.get("questions", []):
-        try:
-            zip_obj.write(
-                f, os.path.join(pkg_path_questions_prefix, os.path.basename(f))
-            )
-        except:
-            log("Unable to add file " + repr(f))
+    # Modules, templates, sources, static, and questions
+    for folder, path_prefix in (
+        ("modules", pkg_path_deep_prefix),
+        ("templates", pkg_path_templates_prefix),
+        ("sources", pkg_path_sources_prefix),
+        ("static", pkg_path_static_prefix),
+        ("questions", pkg_path_questions_prefix),
+    ):
+        for f in folders_and_files.get(folder, []):
+            try:
+                zip_obj.write(f, os.path.join(path_prefix, os.path.basename(f)))
+            except:
+                log("Unable to add file " + repr(f))
 
     zip_obj.close()
     zip_download.commit()
@@ -11,7 +11,7 @@ from docassemble.base.util import get_config
 
 os.environ["OPENAI_API_KEY"] = get_config("openai api key")
 
-from typing import List, Tuple, Optional, Union
+from typing import Any, List, Tuple, Optional, Union
 
 __all__ = [
     "get_labeled_docx_runs",
@@ -20,6 +20,41 @@ __all__ = [
 ]
 
 
+docx_labeling_role_description = """
+    You will process a DOCX document and return a JSON structure that turns the DOCX file into a template 
+    based on the following guidelines and examples. The DOCX will be provided as an annotated series of
+    paragraphs and runs.
+
+    Steps:
+    1. Analyze the document. Identify placeholder text and repeated _____ that should be replaced with a variable name.
+    2. Insert jinja2 tags around a new variable name that represents the placeholder text.
+    3. Mark optional paragraphs with conditional Jinja2 tags.
+    4. Text intended for verbatim output in the final document will remain unchanged.
+    5. The result will be a JSON structure that indicates which paragraphs and runs in the DOCX require modifications,
+    the new text of the modified run with Jinja2 inserted, and a draft question to provide a definition of the variable.
+
+    Example input, with paragraph and run numbers indicated:
+    [
+        [0, 1, "Dear John Smith:"],
+        [1, 0, "This sentence can stay as is in the output and will not be in the reply."],
+        [2, 0, "[Optional: if you are a tenant, include this paragraph]"],
+    ]
+
+    Example reply, indicating paragraph, run, the new text, and a number indicating if this changes the 
+    current paragraph, adds one before, or adds one after (-1, 0, 1):
+
+    {
+        "results": [
+            [0, 1, "Dear {{ other_parties[0] }}:", 0],
+            [2, 0, "{%p if is_tenant %}", -1],
+            [3, 0, "{%p endif %}", "", 1],
+        ]
+    }
+
+    The reply ONLY contains the runs that have modified text.
+    """
+
+
 def add_paragraph_after(paragraph, text):
     p = OxmlElement("w:p")
     p.text = text
@@ -89,43 +124,6 @@ def get_labeled_docx_runs(
     Returns:
         A list of tuples, each containing a paragraph number, run number, and the modified text of the run.
     """
-    if not openai_client:
-        openai_client = OpenAI()
-
-    role_description = """
-    You will process a DOCX document and return a JSON structure that turns the DOCX file into a template 
-    based on the following guidelines and examples. The DOCX will be provided as an annotated series of
-    paragraphs and runs.
-
-    Steps:
-    1. Analyze the document. Identify placeholder text and repeated _____ that should be replaced with a variable name.
-    2. Insert jinja2 tags around a new variable name that represents the placeholder text.
-    3. Mark optional paragraphs with conditional Jinja2 tags.
-    4. Text intended for verbatim output in the final document will remain unchanged.
-    5. The result will be a JSON structure that indicates which paragraphs and runs in the DOCX require modifications,
-    the new text of the modified run with Jinja2 inserted, and a draft question to provide a definition of the variable.
-
-    Example input, with paragraph and run numbers indicated:
-    [
-        [0, 1, "Dear John Smith:"],
-        [1, 0, "This sentence can stay as is in the output and will not be in the reply."],
-        [2, 0, "[Optional: if you are a tenant, include this paragraph]"],
-    ]
-
-    Example reply, indicating paragraph, run, the new text, and a number indicating if this changes the 
-    current paragraph, adds one before, or adds one after (-1, 0, 1):
-
-    {
-        "results": [
-            [0, 1, "Dear {{ other_parties[0] }}:", 0],
-            [2, 0, "{%p if is_tenant %}", -1],
-            [3, 0, "{%p endif %}", "", 1],
-        ]
-    }
-
-    The reply ONLY contains the runs that have modified text.
-    """
-
     custom_name_text = ""
     if custom_people_names:
         assert isinstance(custom_people_names, list)
@@ -228,26 +226,32 @@ def get_labeled_docx_runs(
         Examples: 
         "(State the reason for eviction)" transforms into `{{ eviction_reason }}`.
     """
-    encoding = tiktoken.encoding_for_model("gpt-4")
-
     doc = docx.Document(docx_path)
 
-    items = []
+    items: List[List[Any]] = []
     for pnum, para in enumerate(doc.paragraphs):
         for rnum, run in enumerate(para.runs):
             items.append([pnum, rnum, run.text])
 
+    if not any(text.strip() for _, _, text in items):
+        return []  # Nothing to label, so don't spend a request on it
+
+    system_prompt = docx_labeling_role_description + rules
+
     encoding = tiktoken.encoding_for_model("gpt-4")
-    token_count = len(encoding.encode(role_description + rules + repr(items)))
+    token_count = len(encoding.encode(system_prompt + repr(items)))
     if token_count > 128000:
         raise Exception(
             f"Input to OpenAI is too long ({token_count} tokens). Maximum is 128000 tokens."
         )
 
+    if not openai_client:
+        openai_client = OpenAI()
+
     response = openai_client.chat.completions.create(
         model="gpt-4-1106-preview",
         messages=[
-            {"role": "system", "content": role_description + rules},
+            {"role": "system", "content": system_prompt},
             {"role": "user", "content": repr(items)},
         ],
         response_format={"type": "json_object"},
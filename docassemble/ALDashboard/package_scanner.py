@@ -26,15 +26,16 @@ def installed_pkg_list(target: list) -> dict:
     installed_packages = {}
     key_packages = {}
     non_key_packages = {}
+    target_names = frozenset(target)
 
     for p in pkg_resources.working_set:
         # docassemble packages
         if "docassemble" in p.project_name:
             # Key packages
-            if p.project_name in target:
+            if p.project_name in target_names:
                 key_packages[p.project_name] = p.version
             # non-key packages
-            if p.project_name not in target:
+            else:
                 non_key_packages[p.project_name] = p.version
 
     sorted_key_packages = sort_dict(key_packages)
@@ -189,19 +190,20 @@ def fetch_github_repo_version(repo_list, key_pkgs, github_user) -> dict:
 # -----------------------------------------------------
 def compare_repo_version(server_repo_dict, github_repo_dict) -> dict:
     version_table = {}
+    # Index github repos by their package name (docassemble-X -> docassemble.X)
+    github_repos_by_pkg = {
+        k2.replace("-", "."): v2 for k2, v2 in github_repo_dict.items()
+    }
     for k1, v1 in server_repo_dict.items():  # Loop thru server repos
-        version_table[k1] = {"server": v1, "github": "No new commit"}
-
-        if len(github_repo_dict) > 0:  # If there are any commits in the period
-            for k2, v2 in github_repo_dict.items():
-                if k1 == k2.replace("-", "."):  # If repo match is found
-                    if v1 in v2["version"]:  # Check its version
-                        # Override the version info in the table record
-                        version_table[k1] = {"server": v1, "github": v2["version"]}
-                    else:  # Override the not-matched version info with an alert sign
-                        version_table[k1] = {
-                            "server": v1 + " &#9940",
-                            "github": v2["version"],
-                        }
+        v2 = github_repos_by_pkg.get(k1)
+        if v2 is None:  # No commits in the period
+            version_table[k1] = {"server": v1, "github": "No new commit"}
+        elif v1 in v2["version"]:  # Check its version
+            version_table[k1] = {"server": v1, "github": v2["version"]}
+        else:  # Flag the not-matched version info with an alert sign
+            version_table[k1] = {
+                "server": v1 + " &#9940",
+                "github": v2["version"],
+            }
 
     return version_table
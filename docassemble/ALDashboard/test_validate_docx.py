@@ -1,6 +1,7 @@
+import re
 import unittest
 from typing import Optional
-from .validate_docx import get_jinja_errors
+from .validate_docx import get_jinja_errors, fix_quotes
 from pathlib import Path
 
 
@@ -17,5 +18,11 @@ class TestGetJinjaErrors(unittest.TestCase):
         self.assertIsInstance(result, str)
 
 
+class TestFixQuotes(unittest.TestCase):
+    def test_smart_quotes_and_escaped_ampersands(self):
+        match = re.match(r"(.*)", "{{ x[\u201ca\u201d] or y[\u2018b\u2019] &amp; z }}")
+        self.assertEqual(fix_quotes(match), "{{ x[\"a\"] or y['b'] & z }}")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -42,10 +42,28 @@ import xlsxwriter
 
 from docassemble.base.util import DAFile
 from docassemble.webapp.server import mako_parts
-from typing import NamedTuple, Dict
+from typing import NamedTuple, Dict, List, Set
 
 DEFAULT_LANGUAGE = "en"
 
+non_space_re = re.compile(r"\S")
+package_prefix_re = re.compile(r".*:")
+word_re = re.compile(r"\w+")
+
+# Columns that an existing XLSX translation file must have to be reused
+TRANSLATION_COLUMNS = frozenset(
+    {
+        "interview",
+        "question_id",
+        "index_num",
+        "hash",
+        "orig_lang",
+        "tr_lang",
+        "orig_text",
+        "tr_text",
+    }
+)
+
 __all__ = [
     "Translation",
     "translation_file",
@@ -61,6 +79,18 @@ class Translation(NamedTuple):
     total_rows: int
 
 
+def xliff_text(element: ET.Element) -> str:
+    """
+    Return the text of an XLIFF <source> or <target> element, including the
+    text inside and after any inline <mrk> children.
+    """
+    parts = [element.text or ""]
+    for mrk in element:
+        parts.append(mrk.text or "")
+        parts.append(mrk.tail or "")
+    return "".join(parts)
+
+
 def translation_file(yaml_filename: str, tr_lang: str) -> Translation:
     """
     Return a tuple of the translation file in XLSX format, plus a count of the
@@ -76,9 +106,9 @@ def translation_file(yaml_filename: str, tr_lang: str) -> Translation:
     )
     output_file = DAFile()
     setup_translation()
-    if yaml_filename is None or not re.search(r"\S", yaml_filename):
+    if yaml_filename is None or not non_space_re.search(yaml_filename):
         raise ValueError("YAML filename was not valid")
-    if tr_lang is None or not re.search(r"\S", tr_lang):
+    if tr_lang is None or not non_space_re.search(tr_lang):
         raise ValueError("You must provide a language")
     try:
         interview_source = docassemble.base.parse.interview_source_from_string(
@@ -92,7 +122,8 @@ def translation_file(yaml_filename: str, tr_lang: str) -> Translation:
     tr_cache: Dict = {}
     if len(interview.translations) > 0:
         for item in interview.translations:
-            if item.lower().endswith(".xlsx"):
+            item_lower = item.lower()
+            if item_lower.endswith(".xlsx"):
                 the_xlsx_file = docassemble.base.functions.package_data_filename(item)
                 if not os.path.isfile(the_xlsx_file):
                     continue
@@ -101,21 +132,7 @@ def translation_file(yaml_filename: str, tr_lang: str) -> Translation:
                     na_values=["NaN", "-NaN", "#NA", "#N/A"],
                     keep_default_na=False,
                 )
-                invalid = False
-                for column_name in (
-                    "interview",
-                    "question_id",
-                    "index_num",
-                    "hash",
-                    "orig_lang",
-                    "tr_lang",
-                    "orig_text",
-                    "tr_text",
-                ):
-                    if column_name not in df.columns:
-                        invalid = True
-                        break
-                if invalid:
+                if TRANSLATION_COLUMNS.difference(df.columns):
                     continue
                 for indexno in df.index:
                     try:
@@ -143,19 +160,10 @@ def translation_file(yaml_filename: str, tr_lang: str) -> Translation:
                         "orig_text": str(df["orig_text"][indexno]),
                         "tr_text": str(df["tr_text"][indexno]),
                     }
-                    if df["orig_text"][indexno] not in tr_cache:
-                        tr_cache[df["orig_text"][indexno]] = {}
-                    if (
-                        df["orig_lang"][indexno]
-                        not in tr_cache[df["orig_text"][indexno]]
-                    ):
-                        tr_cache[df["orig_text"][indexno]][
-                            df["orig_lang"][indexno]
-                        ] = {}
-                    tr_cache[df["orig_text"][indexno]][df["orig_lang"][indexno]][
-                        df["tr_lang"][indexno]
-                    ] = the_dict
-            elif item.lower().endswith(".xlf") or item.lower().endswith(".xliff"):
+                    tr_cache.setdefault(df["orig_text"][indexno], {}).setdefault(
+                        df["orig_lang"][indexno], {}
+                    )[df["tr_lang"][indexno]] = the_dict
+            elif item_lower.endswith((".xlf", ".xliff")):
                 the_xlf_file = docassemble.base.functions.package_data_filename(item)
                 if not os.path.isfile(the_xlf_file):
                     continue
@@ -172,28 +180,18 @@ def translation_file(yaml_filename: str, tr_lang: str) -> Translation:
                         for transunit in the_file.iter(
                             "{urn:oasis:names:tc:xliff:document:1.2}trans-unit"
                         ):
-                            orig_text = ""
-                            tr_text = ""
-                            for source in transunit.iter(
-                                "{urn:oasis:names:tc:xliff:document:1.2}source"
-                            ):
-                                if source.text:
-                                    orig_text += source.text
-                                for mrk in source:
-                                    if mrk.text:
-                                        orig_text += mrk.text
-                                    if mrk.tail:
-                                        orig_text += mrk.tail
-                            for target in transunit.iter(
-                                "{urn:oasis:names:tc:xliff:document:1.2}target"
-                            ):
-                                if target.text:
-                                    tr_text += target.text
-                                for mrk in target:
-                                    if mrk.text:
-                                        tr_text += mrk.text
-                                    if mrk.tail:
-                                        tr_text += mrk.tail
+                            orig_text = "".join(
+                                xliff_text(source)
+                                for source in transunit.iter(
+                                    "{urn:oasis:names:tc:xliff:document:1.2}source"
+                                )
+                            )
+                            tr_text = "".join(
+                                xliff_text(target)
+                                for target in transunit.iter(
+                                    "{urn:oasis:names:tc:xliff:document:1.2}target"
+                                )
+                            )
                             if orig_text == "" or tr_text == "":
                                 continue
                             the_dict = {
@@ -208,11 +206,9 @@ def translation_file(yaml_filename: str, tr_lang: str) -> Translation:
                                 "orig_text": orig_text,
                                 "tr_text": tr_text,
                             }
-                            if orig_text not in tr_cache:
-                                tr_cache[orig_text] = {}
-                            if source_lang not in tr_cache[orig_text]:
-                                tr_cache[orig_text][source_lang] = {}
-                            tr_cache[orig_text][source_lang][target_lang] = the_dict
+                            tr_cache.setdefault(orig_text, {}).setdefault(
+                                source_lang, {}
+                            )[target_lang] = the_dict
                             indexno += 1
                 elif root.attrib["version"] == "2.0":
                     source_lang = root.attrib["srcLang"]
@@ -230,28 +226,18 @@ def translation_file(yaml_filename: str, tr_lang: str) -> Translation:
                             for segment in unit.iter(
                                 "{urn:oasis:names:tc:xliff:document:2.0}segment"
                             ):
-                                orig_text = ""
-                                tr_text = ""
-                                for source in transunit.iter(
-                                    "{urn:oasis:names:tc:xliff:document:2.0}source"
-                                ):
-                                    if source.text:
-                                        orig_text += source.text
-                                    for mrk in source:
-                                        if mrk.text:
-                                            orig_text += mrk.text
-                                        if mrk.tail:
-                                            orig_text += mrk.tail
-                                for target in transunit.iter(
-                                    "{urn:oasis:names:tc:xliff:document:2.0}target"
-                                ):
-                                    if target.text:
-                                        tr_text += target.text
-                                    for mrk in target:
-                                        if mrk.text:
-                                            tr_text += mrk.text
-                                        if mrk.tail:
-                                            tr_text += mrk.tail
+                                orig_text = "".join(
+                                    xliff_text(source)
+                                    for source in segment.iter(
+                                        "{urn:oasis:names:tc:xliff:document:2.0}source"
+                                    )
+                                )
+                                tr_text = "".join(
+                                    xliff_text(target)
+                                    for target in segment.iter(
+                                        "{urn:oasis:names:tc:xliff:document:2.0}target"
+                                    )
+                                )
                                 if orig_text == "" or tr_text == "":
                                     continue
                                 the_dict = {
@@ -266,16 +252,16 @@ def translation_file(yaml_filename: str, tr_lang: str) -> Translation:
                                     "orig_text": orig_text,
                                     "tr_text": tr_text,
                                 }
-                                if orig_text not in tr_cache:
-                                    tr_cache[orig_text] = {}
-                                if source_lang not in tr_cache[orig_text]:
-                                    tr_cache[orig_text][source_lang] = {}
-                                tr_cache[orig_text][source_lang][target_lang] = the_dict
+                                tr_cache.setdefault(orig_text, {}).setdefault(
+                                    source_lang, {}
+                                )[target_lang] = the_dict
                                 indexno += 1
     if filetype == "XLSX":
         xlsx_filename = (
             docassemble.base.functions.space_to_underscore(
-                os.path.splitext(os.path.basename(re.sub(r".*:", "", yaml_filename)))[0]
+                os.path.splitext(
+                    os.path.basename(package_prefix_re.sub("", yaml_filename))
+                )[0]
             )
             + "_"
             + tr_lang
@@ -354,9 +340,9 @@ def translation_file(yaml_filename: str, tr_lang: str) -> Translation:
         worksheet.set_column(6, 6, 75)
         worksheet.set_column(6, 7, 75)
         row = 1
-        seen = []
+        seen: Set[str] = set()
         untranslated_segments = 0
-        untranslated_text = ""
+        untranslated_phrases: List[str] = []
         total_rows = 0
         for question in interview.all_questions:
             if not hasattr(question, "translations"):
@@ -398,9 +384,9 @@ def translation_file(yaml_filename: str, tr_lang: str) -> Translation:
                 mako = mako_parts(item)
 
                 if not tr_text:
-                    for phrase in mako:
-                        if phrase[1] == 0:
-                            untranslated_text += phrase[0]
+                    untranslated_phrases.extend(
+                        phrase[0] for phrase in mako if phrase[1] == 0
+                    )
 
                 if len(mako) == 0:  # Can this case occur? Not in tests
                     worksheet.write_string(row, 6, "", wholefixed)
@@ -422,7 +408,7 @@ def translation_file(yaml_filename: str, tr_lang: str) -> Translation:
                             parts.extend([fixedtwo, part[0]])
                     parts.append(fixedcell)
                     worksheet.write_rich_string(*parts)
-                mako = mako_parts(tr_text)
+                mako = mako_parts(tr_text) if tr_text else []
                 if len(mako) == 0:
                     worksheet.write_string(row, 7, "", wholefixedunlocked)
                 elif len(mako) == 1:
@@ -450,7 +436,7 @@ def translation_file(yaml_filename: str, tr_lang: str) -> Translation:
                     worksheet.set_row(row, 15 * (num_lines + 1))
                 indexno += 1
                 row += 1
-                seen.append(item)
+                seen.add(item)
         for item, cache_item in tr_cache.items():
             if (
                 item in seen
@@ -458,40 +444,29 @@ def translation_file(yaml_filename: str, tr_lang: str) -> Translation:
                 or tr_lang not in cache_item[language]
             ):
                 continue
-            worksheet.write_string(
-                row, 0, cache_item[language][tr_lang]["interview"], text
-            )
-            worksheet.write_string(
-                row, 1, cache_item[language][tr_lang]["question_id"], text
-            )
-            worksheet.write_number(
-                row, 2, 1000 + cache_item[language][tr_lang]["index_num"], numb
-            )
-            worksheet.write_string(row, 3, cache_item[language][tr_lang]["hash"], text)
-            worksheet.write_string(
-                row, 4, cache_item[language][tr_lang]["orig_lang"], text
-            )
-            worksheet.write_string(
-                row, 5, cache_item[language][tr_lang]["tr_lang"], text
-            )
-            mako = mako_parts(cache_item[language][tr_lang]["orig_text"])
+            cached_row = cache_item[language][tr_lang]
+            worksheet.write_string(row, 0, cached_row["interview"], text)
+            worksheet.write_string(row, 1, cached_row["question_id"], text)
+            worksheet.write_number(row, 2, 1000 + cached_row["index_num"], numb)
+            worksheet.write_string(row, 3, cached_row["hash"], text)
+            worksheet.write_string(row, 4, cached_row["orig_lang"], text)
+            worksheet.write_string(row, 5, cached_row["tr_lang"], text)
+            mako = mako_parts(cached_row["orig_text"])
             if len(mako) == 1:
                 if mako[0][1] == 0:
-                    worksheet.write_string(
-                        row, 6, cache_item[language][tr_lang]["orig_text"], wholefixed
-                    )
+                    worksheet.write_string(row, 6, cached_row["orig_text"], wholefixed)
                 elif mako[0][1] == 1:
                     worksheet.write_string(
                         row,
                         6,
-                        cache_item[language][tr_lang]["orig_text"],
+                        cached_row["orig_text"],
                         wholefixedone,
                     )
                 elif mako[0][1] == 2:
                     worksheet.write_string(
                         row,
                         6,
-                        cache_item[language][tr_lang]["orig_text"],
+                        cached_row["orig_text"],
                         wholefixedtwo,
                     )
             else:
@@ -505,27 +480,27 @@ def translation_file(yaml_filename: str, tr_lang: str) -> Translation:
                         parts.extend([fixedtwo, part[0]])
                 parts.append(fixedcell)
                 worksheet.write_rich_string(*parts)
-            mako = mako_parts(cache_item[language][tr_lang]["tr_text"])
+            mako = mako_parts(cached_row["tr_text"])
             if len(mako) == 1:
                 if mako[0][1] == 0:
                     worksheet.write_string(
                         row,
                         7,
-                        cache_item[language][tr_lang]["tr_text"],
+                        cached_row["tr_text"],
                         wholefixedunlocked,
                     )
                 elif mako[0][1] == 1:
                     worksheet.write_string(
                         row,
                         7,
-                        cache_item[language][tr_lang]["tr_text"],
+                        cached_row["tr_text"],
                         wholefixedunlockedone,
                     )
                 elif mako[0][1] == 2:
                     worksheet.write_string(
                         row,
                         7,
-                        cache_item[language][tr_lang]["tr_text"],
+                        cached_row["tr_text"],
                         wholefixedunlockedtwo,
                     )
             else:
@@ -539,12 +514,12 @@ def translation_file(yaml_filename: str, tr_lang: str) -> Translation:
                         parts.extend([fixedunlockedtwo, part[0]])
                 parts.append(fixedunlockedcell)
                 worksheet.write_rich_string(*parts)
-            num_lines = cache_item[language][tr_lang]["orig_text"].count("\n")
+            num_lines = cached_row["orig_text"].count("\n")
             if num_lines > 0:
                 worksheet.set_row(row, 15 * (num_lines + 1))
             row += 1
         workbook.close()
-        untranslated_words = len(re.findall(r"\w+", untranslated_text))
+        untranslated_words = len(word_re.findall("".join(untranslated_phrases)))
         return Translation(
             output_file, untranslated_words, untranslated_segments, total_rows
         )
@@ -9,6 +9,10 @@ from typing import List, Tuple
 
 __all__ = ["validate_attachment_block"]
 
+# Every Mako construct (expressions, tags, control lines, comments and line
+# continuations) contains at least one of these
+mako_markers = ("${", "%", "##", "\\")
+
 
 def validate_attachment_block(fields_statement: str) -> List[Tuple[str, str]]:
     yaml = ruamel.yaml.YAML(typ="rt")
@@ -17,7 +21,12 @@ def validate_attachment_block(fields_statement: str) -> List[Tuple[str, str]]:
     errors = []
     for index, row in enumerate(parsed_blocks["fields"]):
         try:
-            mytemplate = mako.template.Template(next(iter(row.values())))
+            value = next(iter(row.values()))
+            if isinstance(value, str) and not any(
+                marker in value for marker in mako_markers
+            ):
+                continue  # Plain text can't have a Mako error
+            mytemplate = mako.template.Template(value)
             content = mytemplate.render()
         except:
             errors.append(
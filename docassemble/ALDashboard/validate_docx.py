@@ -24,6 +24,8 @@ nameerror_match = re.compile(
     r"\'(.*)\' (is not defined|referenced before assignment|is undefined)"
 )
 
+jinja_tag_match = re.compile(r"({[\%\{].*?[\%\}]})")
+
 
 def extract_missing_name(the_error):
     m = nameerror_match.search(str(the_error))
@@ -34,7 +36,8 @@ def extract_missing_name(the_error):
 
 class DAEnvironment(Environment):
     def from_string(self, source, **kwargs):  # pylint: disable=arguments-differ
-        source = re.sub(r"({[\%\{].*?[\%\}]})", fix_quotes, source)
+        if "{%" in source or "{{" in source:
+            source = jinja_tag_match.sub(fix_quotes, source)
         return super().from_string(source, **kwargs)
 
     def getitem(self, obj, argument):
@@ -56,23 +59,14 @@ class DAEnvironment(Environment):
             return self.undefined(obj=obj, name=attribute, accesstype="attribute")
 
 
+# Word's "smart" quotes are not valid Jinja2 string delimiters
+smart_quote_table = str.maketrans(
+    {"\u201c": '"', "\u201d": '"', "\u2018": "'", "\u2019": "'"}
+)
+
+
 def fix_quotes(match):
-    instring = match.group(1)
-    n = len(instring)
-    output = ""
-    i = 0
-    while i < n:
-        if instring[i] == "\u201c" or instring[i] == "\u201d":
-            output += '"'
-        elif instring[i] == "\u2018" or instring[i] == "\u2019":
-            output += "'"
-        elif instring[i] == "&" and i + 4 < n and instring[i : i + 5] == "&amp;":
-            output += "&"
-            i += 4
-        else:
-            output += instring[i]
-        i += 1
-    return output
+    return match.group(1).translate(smart_quote_table).replace("&amp;", "&")
 
 
 class CallAndDebugUndefined(DebugUndefined):